@@ -8,12 +8,85 @@ Prepares data for submission to Storywrangler API.
 
 import pandas as pd
 import json
+import logging
+import orjson
+import re
+import time
+import unicodedata
+from functools import lru_cache
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Optional, Dict, List
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from rapidfuzz import process, fuzz, utils
+from metaphone import doublemetaphone
+from tqdm import tqdm
+from tqdm.contrib.logging import logging_redirect_tqdm
 from storywrangler.validation import EntityValidator
 from pyprojroot.here import here
 
+log = logging.getLogger(__name__)
+
+# Minimum token_sort_ratio (0-100) to accept a fuzzy name → text file match.
+# Kept high so only spelling, accent or word-order differences get through.
+FUZZY_SCORE_CUTOFF = 90
+
+# Wikidata lookups are cached on disk; misses expire sooner so new items get picked up
+WIKIDATA_CACHE_TTL = 30 * 24 * 3600
+WIKIDATA_NEGATIVE_CACHE_TTL = 24 * 3600
+
+WIKIDATA_SPARQL_URL = "https://query.wikidata.org/sparql"
+SPARQL_BATCH_SIZE = 50  # names per query, well below WDQS limits
+SPARQL_MAX_RETRIES = 3
+
+# Concurrent per-person lookups in prepare()
+MAX_WORKERS = 8
+
+# "Mary (Polly) O. Smith" -> "mary_polly_o_smith"
+_LOCAL_ID_TRANS = str.maketrans({" ": "_", ".": None, ",": None, "(": None, ")": None})
+
+# Punctuation dropped from names before building text file candidates
+_NAME_CLEAN_TRANS = str.maketrans("", "", "().,")
+
+# normalize_name also drops apostrophes and splits hyphenated names:
+# "Ladd-Franklin" -> "ladd franklin", "O'Brien" -> "obrien"
+_NORMALIZE_TRANS = str.maketrans({"-": " ", "'": None, "(": None, ")": None, ".": None, ",": None})
+
+# Text file stem candidates in priority order, as (minimum name parts, builder
+# over the split lowercase name). For "Sister Mary Nicholas Arnoldy":
+# arnoldy_sister_mary_nicholas, arnoldy_nicholas, arnoldy_sister, sister_arnoldy
+_CANDIDATE_TEMPLATES = (
+    (2, lambda parts: parts.str[-1] + "_" + parts.str[:-1].str.join("_")),
+    (3, lambda parts: parts.str[-1] + "_" + parts.str[-2]),   # Just first name
+    (3, lambda parts: parts.str[-1] + "_" + parts.str[0]),    # Just first word
+    (2, lambda parts: parts.str[0] + "_" + parts.str[-1]),
+)
+
+# Shape of the ids this adapter builds itself; these skip the full EntityValidator
+_ENTITY_ID_RE = re.compile(r"^(wikidata:Q\d+|local:[a-z0-9-]+:[a-z0-9_-]+)$")
+
+# Biographies kept in memory across prepare() runs; bounded so large corpora
+# don't end up fully resident while texts are streamed to disk
+TEXT_CACHE_SIZE = 256
+
+USER_AGENT = "WomenInMathAdapter/0.1 (https://github.com/Vermont-Complex-Systems/women-in-mathematics)"
+
+
+def normalize_name(name: str) -> str:
+    """Strip diacritics and punctuation and lowercase: "Émilie (du Châtelet)" -> "emilie du chatelet" """
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    return ascii_name.lower().translate(_NORMALIZE_TRANS)
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _read_text(path: Path) -> bytes:
+    """Read a biography as raw UTF-8; repeated prepare() runs hit the cache"""
+    return path.read_bytes()
+
+
 class WomenInMathAdapter:
     
     def __init__(self, data_dir: Path, text_dir: Path, output_dir: Path):
@@ -21,12 +94,76 @@ class WomenInMathAdapter:
         self.text_dir = Path(text_dir)
         self.output_dir = Path(output_dir)
         self.validator = EntityValidator()
+        
+        # One pooled session shared by all worker threads: keep-alive + retries on 429/5xx
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=16,
+            max_retries=Retry(total=5, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+        )
+        self.session.mount("https://", adapter)
+        # SPARQL queries are read-only POSTs, so let urllib3 retry them too.
+        # This is the only retry layer for them; _run_sparql does not loop.
+        self.session.mount(WIKIDATA_SPARQL_URL, HTTPAdapter(
+            max_retries=Retry(
+                total=SPARQL_MAX_RETRIES,
+                backoff_factor=1,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=frozenset({"POST"}),
+                raise_on_status=False
+            )
+        ))
+        self.session.headers.update({"User-Agent": USER_AGENT})
         self.personal = pd.read_csv(self.data_dir / "personal.csv")
+        self.personal['local_id'] = self.personal['full_name'].str.lower().str.translate(_LOCAL_ID_TRANS)
         
         # Build text file mapping
         self.text_files = self._build_text_mapping()
         
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        
+        # Texts are streamed here during prepare(), one JSON object per line
+        self.texts_file = self.output_dir / "texts.ndjson"
+        
+        # Persistent Wikidata cache: name.lower() -> {"qid": str | None, "timestamp": float}
+        self.wikidata_cache_file = self.output_dir / ".wikidata_cache.json"
+        self.wikidata_cache = self._load_wikidata_cache()
+    
+    def _load_wikidata_cache(self) -> Dict[str, Dict]:
+        """Load cached Wikidata lookups, dropping expired entries"""
+        if not self.wikidata_cache_file.exists():
+            return {}
+        
+        try:
+            with open(self.wikidata_cache_file) as f:
+                cache = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log.warning("Ignoring unreadable Wikidata cache: %s", e)
+            return {}
+        
+        if not isinstance(cache, dict):
+            log.warning("Ignoring unreadable Wikidata cache: expected an object")
+            return {}
+        
+        now = time.time()
+        fresh = {}
+        for key, entry in cache.items():
+            # Skip hand-edited or truncated entries rather than failing the run
+            try:
+                qid, timestamp = entry["qid"], float(entry["timestamp"])
+            except (TypeError, KeyError, ValueError):
+                log.warning("Ignoring malformed Wikidata cache entry for %r", key)
+                continue
+            ttl = WIKIDATA_CACHE_TTL if qid else WIKIDATA_NEGATIVE_CACHE_TTL
+            if now - timestamp < ttl:
+                fresh[key] = entry
+        return fresh
+    
+    def _save_wikidata_cache(self):
+        """Write Wikidata lookups to disk"""
+        with open(self.wikidata_cache_file, 'w') as f:
+            json.dump(self.wikidata_cache, f, indent=2)
     
     def _build_text_mapping(self) -> Dict[str, Path]:
         """
@@ -35,6 +172,8 @@ class WomenInMathAdapter:
         Text files are named like: adams_rachel.pdf.txt
         """
         mapping = {}
+        # Match score per person (100 for exact stem matches), kept for auditing
+        self.match_scores: Dict[str, float] = {}
         
         # Get all text files (including .pdf.txt)
         text_files = list(self.text_dir.glob("*.txt"))
@@ -44,56 +183,110 @@ class WomenInMathAdapter:
         if len(text_files) > 0:
             print(f"   Example: {text_files[0].name}")
         
-        # Try to match each person to a text file
-        for _, person in self.personal.iterrows():
-            name = person['full_name']
-            
-            # Generate candidates: lastname_firstname format
-            # "Rachel Adams" -> "adams_rachel"
-            name_parts = name.split()
-            
-            candidates = []
-            
-            # Try lastname_firstname
-            if len(name_parts) >= 2:
-                # Handle cases like "Sister Mary Nicholas Arnoldy"
-                # Try: arnoldy_sister_mary_nicholas, arnoldy_mary_nicholas, arnoldy_nicholas
-                lastname = name_parts[-1].lower()
-                firstnames = [p.lower() for p in name_parts[:-1]]
-                
-                # Try all combinations
-                candidates.append(f"{lastname}_{'_'.join(firstnames)}")
-                if len(firstnames) > 1:
-                    candidates.append(f"{lastname}_{firstnames[-1]}")  # Just first name
-                    candidates.append(f"{lastname}_{firstnames[0]}")   # Just first word
-            
-            # Also try firstname_lastname
-            if len(name_parts) >= 2:
-                firstname = name_parts[0].lower()
-                lastname = name_parts[-1].lower()
-                candidates.append(f"{firstname}_{lastname}")
-            
-            # Try full name as-is (lowercase, underscores)
-            candidates.append(name.lower().replace(" ", "_").replace(".", "").replace(",", ""))
-            
-            # Clean up candidates (remove special chars)
-            candidates = [
-                c.replace("(", "").replace(")", "").replace(".", "")
-                for c in candidates
+        # Index text files by normalized stem once, so each candidate is a dict lookup
+        # Remove .pdf.txt or .txt extension: "adams_rachel.pdf.txt" -> "adams_rachel"
+        self._stem_index = {
+            tf.name.removesuffix(".pdf.txt").removesuffix(".txt").lower(): tf
+            for tf in text_files
+        }
+        
+        # Generate candidates column-wise: lastname_firstname format
+        # "Rachel Adams" -> "adams_rachel"
+        # Clean once up front so every template works on tidy tokens
+        names = self.personal['full_name']
+        parts = names.str.lower().str.translate(_NAME_CLEAN_TRANS).str.split()
+        n_parts = parts.str.len()
+        
+        # Finally try the full name as-is (the local id)
+        candidate_columns = [
+            build(parts).where(n_parts >= min_parts)
+            for min_parts, build in _CANDIDATE_TEMPLATES
+        ] + [self.personal['local_id']]
+        
+        candidates = pd.concat(
+            [
+                pd.DataFrame({
+                    "order": range(len(names)),
+                    "full_name": names,
+                    "candidate": column,
+                    "priority": priority
+                })
+                for priority, column in enumerate(candidate_columns)
             ]
+        ).dropna(subset=["candidate"])
+        
+        # Join all candidates against the stem index at once, keeping the
+        # highest-priority hit per person, in input order
+        stems = pd.DataFrame({
+            "candidate": list(self._stem_index.keys()),
+            "path": list(self._stem_index.values())
+        })
+        matches = (
+            candidates.merge(stems, on="candidate")
+            .sort_values(["order", "priority"])
+            .drop_duplicates("full_name")
+        )
+        
+        for name, path in zip(matches["full_name"], matches["path"]):
+            mapping[name] = path
+            self.match_scores[name] = 100.0
+        
+        unmatched = [name for name in names if name not in mapping]
+        
+        # Fuzzy fallback for names that differ by typos, accents or word order
+        # Choices map stem -> "adams rachel" so the scorer sees words
+        choices = {stem: normalize_name(stem.replace("_", " ")) for stem in self._stem_index}
+        
+        # A file already given to someone else is never reused
+        claimed = set(mapping.values())
+        
+        # Block by how the surname sounds: each name is only scored against
+        # files whose surname is phonetically the same. Stems are usually
+        # lastname_first but may be first_lastname, so index both ends.
+        buckets: Dict[str, Dict[str, str]] = defaultdict(dict)
+        for stem, choice in choices.items():
+            tokens = choice.split()
+            for token in {tokens[0], tokens[-1]} if tokens else ():
+                key = doublemetaphone(token)[0]
+                if key:
+                    buckets[key][stem] = choice
+        
+        fuzzy_matches = []
+        still_unmatched = []
+        
+        for name in unmatched:
+            normalized = normalize_name(name)
+            # Surname is the last word; a hyphenated one ("Ladd-Franklin") may be
+            # filed under either part, so look in each part's bucket
+            surname_parts = normalize_name(name.split()[-1]).split() if name.split() else []
+            keys = {doublemetaphone(part)[0] for part in surname_parts}
+            # No file with a similar-sounding surname means no match
+            candidates = {
+                stem: choice
+                for key in keys
+                for stem, choice in buckets.get(key, {}).items()
+                if self._stem_index[stem] not in claimed
+            }
             
-            # Check each candidate against text files
-            for candidate in candidates:
-                for text_file in text_files:
-                    # Remove .pdf.txt or .txt extension
-                    stem = text_file.name.replace(".pdf.txt", "").replace(".txt", "")
-                    
-                    if stem.lower() == candidate.lower():
-                        mapping[name] = text_file
-                        break
-                
-                if name in mapping:
-                    break
+            result = process.extractOne(
+                normalized,
+                candidates,
+                scorer=fuzz.token_sort_ratio,
+                # Query and choices are already normalized; this also evens out any
+                # leftover punctuation or whitespace so both sides compare alike
+                processor=utils.default_process,
+                score_cutoff=FUZZY_SCORE_CUTOFF
+            ) if candidates else None
+            if result:
+                _, score, stem = result
+                mapping[name] = self._stem_index[stem]
+                claimed.add(mapping[name])
+                self.match_scores[name] = score
+                fuzzy_matches.append(name)
+            else:
+                still_unmatched.append(name)
+        
+        unmatched = still_unmatched
         
         print(f"✅ Matched {len(mapping)}/{len(self.personal)} people to text files\n")
         
@@ -103,12 +296,12 @@ class WomenInMathAdapter:
             for name, path in list(mapping.items())[:3]:
                 print(f"     {name} → {path.name}")
         
-        if len(mapping) < len(self.personal):
-            unmatched = [
-                person['full_name'] 
-                for _, person in self.personal.iterrows() 
-                if person['full_name'] not in mapping
-            ]
+        if fuzzy_matches:
+            print(f"\n   🔎 {len(fuzzy_matches)} fuzzy matches:")
+            for name in fuzzy_matches[:5]:
+                print(f"     {name} → {mapping[name].name} ({self.match_scores[name]:.0f})")
+        
+        if unmatched:
             print(f"\n   ⚠️  {len(unmatched)} unmatched people:")
             for name in unmatched[:5]:
                 print(f"     - {name}")
@@ -119,8 +312,81 @@ class WomenInMathAdapter:
         
         return mapping
     
+    def batch_lookup_wikidata(self, names: List[str]):
+        """
+        Resolve many names at once via SPARQL, filling the Wikidata cache
+        
+        Matches English labels exactly and keeps only items whose occupation is
+        mathematician (Q170790) or a subclass of it. Names not found here, or
+        whose label matches more than one mathematician, are left for
+        lookup_wikidata to search individually.
+        """
+        pending = [name for name in dict.fromkeys(names) if name.lower() not in self.wikidata_cache]
+        if not pending:
+            return
+        
+        print(f"🔍 Batch querying Wikidata for {len(pending)} names")
+        found = 0
+        
+        for start in range(0, len(pending), SPARQL_BATCH_SIZE):
+            batch = pending[start:start + SPARQL_BATCH_SIZE]
+            # json.dumps escapes quotes and backslashes, which is also valid SPARQL
+            values = " ".join(f"{json.dumps(name, ensure_ascii=False)}@en" for name in batch)
+            query = f"""
+                SELECT ?label ?item WHERE {{
+                    VALUES ?label {{ {values} }}
+                    ?item rdfs:label ?label ;
+                          wdt:P106/wdt:P279* wd:Q170790 .
+                }}
+            """
+            
+            bindings = self._run_sparql(query)
+            if bindings is None:
+                continue
+            
+            qids_by_label = defaultdict(set)
+            for binding in bindings:
+                qid = binding["item"]["value"].rsplit("/", 1)[-1]
+                qids_by_label[binding["label"]["value"].lower()].add(qid)
+            
+            now = time.time()
+            for key, qids in qids_by_label.items():
+                # Shared labels are ambiguous; let wbsearchentities ranking decide
+                if len(qids) > 1:
+                    log.debug("%s matches %s; searching individually", key, sorted(qids))
+                    continue
+                self.wikidata_cache[key] = {"qid": qids.pop(), "timestamp": now}
+                found += 1
+        
+        print(f"   ✓ {found}/{len(pending)} resolved in batch\n")
+    
+    def _run_sparql(self, query: str) -> Optional[List[Dict]]:
+        """POST a SPARQL query (retried with backoff by the session adapter)"""
+        try:
+            response = self.session.post(
+                WIKIDATA_SPARQL_URL,
+                data={"query": query},
+                headers={"Accept": "application/sparql-results+json"},
+                timeout=120
+            )
+            if response.status_code == 200:
+                return response.json()["results"]["bindings"]
+            log.warning("SPARQL query failed: %s", response.status_code)
+        except Exception as e:
+            log.warning("SPARQL query failed: %s", e)
+        
+        return None
+    
     def lookup_wikidata(self, name: str) -> Optional[str]:
-        """Look up Wikidata Q-code via API"""
+        """Look up Wikidata Q-code, using the on-disk cache before the API"""
+        key = name.lower()
+        
+        cached = self.wikidata_cache.get(key)
+        if cached is not None:
+            if cached["qid"]:
+                log.debug("%s → %s (cached)", name, cached["qid"])
+            return cached["qid"]
+        
         try:
             url = "https://www.wikidata.org/w/api.php"
             params = {
@@ -131,30 +397,30 @@ class WomenInMathAdapter:
                 "search": name,
                 "limit": 3
             }
-            headers = {
-                "User-Agent": "WomenInMathAdapter/0.1 (https://github.com/Vermont-Complex-Systems/women-in-mathematics)"
-            }
             
-            response = requests.get(url, params=params, headers=headers, timeout=10)
+            response = self.session.get(url, params=params, timeout=10)
             if response.status_code != 200:
                 return None
             
             results = response.json().get("search", [])
             
+            qid = None
             for result in results:
                 desc = result.get("description", "").lower()
                 if "mathematician" in desc:
                     qid = result["id"]
-                    print(f"  ✓ {qid}")
-                    return qid
+                    log.debug("%s → %s", name, qid)
+                    break
             
-            return None
+            # Cache misses too, so repeated runs don't re-query unknown names
+            self.wikidata_cache[key] = {"qid": qid, "timestamp": time.time()}
+            return qid
             
         except Exception as e:
-            print(f"  ⚠️  {e}")
+            log.warning("Wikidata lookup failed for %s: %s", name, e)
             return None
     
-    def map_entity(self, person: pd.Series) -> Dict:
+    def map_entity(self, person: Dict) -> Dict:
         """Map person to entity identifiers"""
         name = person['full_name']
         
@@ -166,22 +432,20 @@ class WomenInMathAdapter:
             confidence = 0.8
             
             # Keep local ID as alternate
-            local_id = name.lower().replace(" ", "_").replace(".", "").replace(",", "").replace("(", "").replace(")", "")
-            entity_ids = [f"local:women-in-math:{local_id}"]
+            entity_ids = [f"local:women-in-math:{person['local_id']}"]
         else:
             # Use local identifier as primary
-            local_id = name.lower().replace(" ", "_").replace(".", "").replace(",", "").replace("(", "").replace(")", "")
-            entity_id = f"local:women-in-math:{local_id}"
+            entity_id = f"local:women-in-math:{person['local_id']}"
             confidence = 0.5
             entity_ids = None
         
         # Validate
-        if not self.validator.validate(entity_id):
+        if not self._is_valid_id(entity_id):
             raise ValueError(f"Invalid entity_id: {entity_id}")
         
         if entity_ids:
             for eid in entity_ids:
-                if not self.validator.validate(eid):
+                if not self._is_valid_id(eid):
                     raise ValueError(f"Invalid alternate entity_id: {eid}")
         
         return {
@@ -190,61 +454,108 @@ class WomenInMathAdapter:
             "confidence": confidence
         }
     
-    def get_text(self, name: str) -> Optional[str]:
-        """Get biography text using pre-built mapping"""
-        text_file = self.text_files.get(name)
-        
-        if text_file and text_file.exists():
-            return text_file.read_text()
+    def _is_valid_id(self, entity_id: str) -> bool:
+        """Accept well-formed ids via regex, deferring anything unusual to the validator"""
+        return bool(_ENTITY_ID_RE.match(entity_id)) or self.validator.validate(entity_id)
+    
+    def get_text(self, text_file: Path) -> Optional[bytes]:
+        """Get biography text (undecoded UTF-8) from a file in the pre-built mapping"""
+        try:
+            return _read_text(text_file)
+        except FileNotFoundError:
+            return None
+    
+    def _prepare_one(self, person: Dict) -> tuple[Optional[Dict], Optional[Dict]]:
+        """Build the author record and text entry (entity id + text file) for one person"""
+        name = person['full_name']
         
-        return None
+        try:
+            # Map to entity ID
+            mapping = self.map_entity(person)
+            
+            # Get biographical data
+            author = {
+                "entity_id": mapping["entity_id"],
+                "entity_ids": mapping["entity_ids"],
+                "entity_type": "person",
+                "confidence": mapping["confidence"],
+                "name": name,
+                "biographical_data": {
+                    "birth_year": int(person['birthyear']) if pd.notna(person['birthyear']) else None,
+                    "death_year": int(person['deathyear']) if pd.notna(person['deathyear']) else None,
+                    "birthplace": person.get('birthplace'),
+                    "field": "wikidata:Q395"
+                }
+            }
+            
+            # Only point at the text; prepare() reads it when it's written
+            text_file = self.text_files.get(name)
+            if text_file:
+                return author, {
+                    "entity_id": mapping["entity_id"],
+                    "path": text_file
+                }
+            
+            return author, None
+            
+        except Exception as e:
+            log.warning("Skipping %s: %s", name, e)
+            return None, None
     
-    def prepare(self) -> tuple[Dict, List[Dict]]:
-        """Prepare dataset for submission"""
+    def prepare(self) -> tuple[Dict, int]:
+        """Prepare dataset for submission, streaming texts to texts.ndjson
+        
+        Returns the dataset metadata and the number of texts written.
+        """
         print("🔧 Preparing Women in Mathematics dataset\n")
         
-        authors = []
-        texts = []
+        results = {}
+        pending = {}
+        next_idx = 0
+        text_count = 0
         
-        for idx, person in self.personal.iterrows():
-            name = person['full_name']
-            print(f"[{idx+1}/{len(self.personal)}] {name}")
+        try:
+            # Resolve as many names as possible in a few batched queries first
+            self.batch_lookup_wikidata(self.personal['full_name'].tolist())
             
-            try:
-                # Map to entity ID
-                mapping = self.map_entity(person)
-                
-                # Get biographical data
-                author = {
-                    "entity_id": mapping["entity_id"],
-                    "entity_ids": mapping["entity_ids"],
-                    "entity_type": "person",
-                    "confidence": mapping["confidence"],
-                    "name": name,
-                    "biographical_data": {
-                        "birth_year": int(person['birthyear']) if pd.notna(person['birthyear']) else None,
-                        "death_year": int(person['deathyear']) if pd.notna(person['deathyear']) else None,
-                        "birthplace": person.get('birthplace'),
-                        "field": "wikidata:Q395"
-                    }
+            # Remaining work is I/O-bound (Wikidata search + text reads), so overlap it.
+            # Keep the pool small to stay under Wikidata's rate limits.
+            # Texts are written in input order so texts.ndjson is stable between runs.
+            # Workers return only the text's path, so people finishing ahead of an
+            # earlier, slower one are held back as small tuples, and each text is
+            # read only just before it's written. Worker warnings go through tqdm
+            # so they don't break up the progress bar.
+            with (
+                ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor,
+                open(self.texts_file, 'wb') as f,
+                logging_redirect_tqdm()
+            ):
+                futures = {
+                    executor.submit(self._prepare_one, person): idx
+                    for idx, person in enumerate(self.personal.to_dict('records'))
                 }
-                
-                authors.append(author)
-                
-                # Get text
-                text = self.get_text(name)
-                if text:
-                    print(f"  ✓ Text: {len(text)} chars")
-                    texts.append({
-                        "entity_id": mapping["entity_id"],
-                        "text": text
-                    })
-                
-                print()
-                
-            except Exception as e:
-                print(f"  ❌ Error: {e}\n")
-                continue
+                for future in tqdm(as_completed(futures), total=len(futures), desc="Preparing"):
+                    idx = futures.pop(future)
+                    results[idx], pending[idx] = future.result()
+            
+                    while next_idx in pending:
+                        entry = pending.pop(next_idx)
+                        next_idx += 1
+                        text = self.get_text(entry["path"]) if entry else None
+                        if text:
+                            log.debug("Text for %s: %d bytes", entry["entity_id"], len(text))
+                            # Texts are kept as bytes until here; decode only for serialization
+                            f.write(orjson.dumps({
+                                "entity_id": entry["entity_id"],
+                                "text": text.decode("utf-8", errors="replace")
+                            }))
+                            f.write(b"\n")
+                            text_count += 1
+        finally:
+            # Save even if interrupted, so lookups already paid for aren't lost
+            self._save_wikidata_cache()
+        
+        authors = [results[idx] for idx in sorted(results) if results[idx]]
         
         # Create dataset submission
         dataset = {
@@ -255,30 +566,25 @@ class WomenInMathAdapter:
             "authors": authors
         }
         
-        return dataset, texts
+        return dataset, text_count
     
-    def save(self, dataset: Dict, texts: List[Dict]):
-        """Save prepared data to output/"""
+    def save(self, dataset: Dict, text_count: int):
+        """Save prepared metadata to output/ (texts are already written by prepare)"""
         
         # Save dataset metadata
         dataset_file = self.output_dir / "dataset.json"
-        with open(dataset_file, 'w') as f:
-            json.dump(dataset, f, indent=2)
-        
-        # Save texts for ingestion
-        texts_file = self.output_dir / "texts.json"
-        with open(texts_file, 'w') as f:
-            json.dump({"texts": texts}, f, indent=2)
+        dataset_file.write_bytes(orjson.dumps(dataset, option=orjson.OPT_INDENT_2))
         
         print(f"✅ Prepared {len(dataset['authors'])} authors")
-        print(f"✅ Found text for {len(texts)} authors")
+        print(f"✅ Found text for {text_count} authors")
         print(f"\n📁 Output:")
         print(f"  - Metadata: {dataset_file}")
-        print(f"  - Texts: {texts_file}")
+        print(f"  - Texts: {self.texts_file}")
         
         # Summary
-        wikidata_count = sum(1 for a in dataset['authors'] if a['entity_id'].startswith('wikidata:'))
-        local_count = sum(1 for a in dataset['authors'] if a['entity_id'].startswith('local:'))
+        prefixes = Counter(a['entity_id'].partition(':')[0] for a in dataset['authors'])
+        wikidata_count = prefixes['wikidata']
+        local_count = prefixes['local']
         
         print(f"\n📊 Entity Mapping:")
         print(f"  - Wikidata: {wikidata_count}")
@@ -292,6 +598,8 @@ class WomenInMathAdapter:
 def main():
     """Run the adapter"""
     
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    
     # Paths relative to: src/women_in_mathematics/defs/adapter/src/prepare.py
     base_defs = Path(__file__).parent.parent.parent  # Go up to defs/
     
@@ -316,10 +624,10 @@ def main():
     
     # Prepare
     adapter = WomenInMathAdapter(data_dir, text_dir, output_dir)
-    dataset, texts = adapter.prepare()
+    dataset, text_count = adapter.prepare()
     
     # Save
-    adapter.save(dataset, texts)
+    adapter.save(dataset, text_count)
 
 
 if __name__ == "__main__":
@@ -6,18 +6,87 @@ Submit Women in Mathematics dataset to Storywrangler API
 Reads prepared data from output/ and POSTs to API endpoints.
 """
 
-import json
-import requests
+import asyncio
+import gzip
+import httpx
+import logging
+import orjson
+import time
 from pathlib import Path
 from typing import Optional
+from tqdm import tqdm
+from tqdm.contrib.logging import logging_redirect_tqdm
+
+log = logging.getLogger(__name__)
+
+USER_AGENT = "WomenInMathSubmitter/0.1 (https://github.com/Vermont-Complex-Systems/women-in-mathematics)"
+
+# Texts ingested in parallel; the API does the heavy lifting (n-gram extraction)
+MAX_CONCURRENT_INGESTS = 8
+
+# Responses worth retrying (rate limited or temporarily unavailable), with
+# exponential backoff between attempts: 0.5s, 1s, 2s, ...
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 0.5
 
 
 class WomenInMathSubmitter:
     
-    def __init__(self, output_dir: Path, api_url: str = "http://localhost:8000"):
+    def __init__(self, output_dir: Path, api_url: str = "http://localhost:8000", gzip_bodies: bool = False):
         self.output_dir = Path(output_dir)
         self.api_url = api_url
         self.dataset_id = "women-in-math"
+        # Only for APIs that decode gzip request bodies; Starlette's GZipMiddleware
+        # compresses responses but does not decompress requests
+        self.gzip_bodies = gzip_bodies
+        
+        # "unix:///tmp/storywrangler.sock" reaches an API on this host over a Unix
+        # domain socket (uvicorn app.main:app --uds /tmp/storywrangler.sock),
+        # bypassing the TCP stack; anything else is a regular HTTP(S) URL
+        if api_url.startswith("unix://"):
+            self.uds = api_url.removeprefix("unix://")
+            self.base_url = "http://localhost"
+        else:
+            self.uds = None
+            self.base_url = api_url
+        
+        # Reuse connections across requests; retry failed connection attempts
+        self.client = httpx.Client(
+            base_url=self.base_url,
+            transport=httpx.HTTPTransport(uds=self.uds, retries=5),
+            headers={"User-Agent": USER_AGENT},
+            timeout=60
+        )
+    
+    def close(self):
+        """Close the underlying HTTP client"""
+        self.client.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def _post(self, url: str, **kwargs) -> httpx.Response:
+        """POST with the shared client, retrying RETRY_STATUSES with backoff"""
+        for attempt in range(MAX_RETRIES):
+            response = self.client.post(url, **kwargs)
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            time.sleep(BACKOFF_FACTOR * 2 ** attempt)
+        return self.client.post(url, **kwargs)
+    
+    @staticmethod
+    async def _apost(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+        """Async counterpart of _post"""
+        for attempt in range(MAX_RETRIES):
+            response = await client.post(url, **kwargs)
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            await asyncio.sleep(BACKOFF_FACTOR * 2 ** attempt)
+        return await client.post(url, **kwargs)
     
     def submit_metadata(self) -> bool:
         """Submit dataset metadata to /api/women-in-math"""
@@ -31,15 +100,10 @@ class WomenInMathSubmitter:
         
         print(f"📤 Submitting metadata to {self.api_url}/api/{self.dataset_id}")
         
-        with open(dataset_file) as f:
-            dataset = json.load(f)
+        dataset = orjson.loads(dataset_file.read_bytes())
         
         try:
-            response = requests.post(
-                f"{self.api_url}/api/{self.dataset_id}",
-                json=dataset,
-                headers={"Content-Type": "application/json"}
-            )
+            response = self._post(f"/api/{self.dataset_id}", json=dataset)
             
             if response.status_code == 200:
                 result = response.json()
@@ -50,7 +114,7 @@ class WomenInMathSubmitter:
                 print(f"   {response.text}")
                 return False
                 
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             print(f"❌ Could not connect to {self.api_url}")
             print(f"   Is the API running? (uvicorn app.main:app --reload)")
             return False
@@ -61,60 +125,119 @@ class WomenInMathSubmitter:
     def submit_texts(self) -> int:
         """Submit texts for ingestion to /api/women-in-math/ingest"""
         
-        texts_file = self.output_dir / "texts.json"
+        texts_file = self.output_dir / "texts.ndjson"
         
         if not texts_file.exists():
             print(f"⚠️  No texts file found: {texts_file}")
             return 0
         
-        with open(texts_file) as f:
-            data = json.load(f)
-            texts = data.get("texts", [])
+        # One text per line; count them up front for progress reporting
+        with open(texts_file, "rb") as f:
+            total = sum(1 for line in f if line.strip())
         
-        if not texts:
+        if not total:
             print("⚠️  No texts to ingest")
             return 0
         
-        print(f"\n📤 Ingesting {len(texts)} texts to {self.api_url}/api/{self.dataset_id}/ingest")
+        print(f"\n📤 Ingesting {total} texts to {self.api_url}/api/{self.dataset_id}/ingest")
         
-        success_count = 0
-        failed_count = 0
+        success_count = asyncio.run(self._ingest_texts(texts_file, total))
+        failed_count = total - success_count
         
-        for idx, text_data in enumerate(texts, 1):
-            entity_id = text_data["entity_id"]
-            text = text_data["text"]
-            
-            print(f"[{idx}/{len(texts)}] {entity_id[:50]}...", end=" ")
-            
-            try:
-                response = requests.post(
-                    f"{self.api_url}/api/{self.dataset_id}/ingest",
-                    json={
-                        "entity_id": entity_id,
-                        "text": text
-                    },
-                    headers={"Content-Type": "application/json"}
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    ngrams = result.get("ngrams_extracted", 0)
-                    print(f"✅ ({ngrams} n-grams)")
-                    success_count += 1
-                else:
-                    print(f"❌ {response.status_code}")
-                    failed_count += 1
-                    
-            except Exception as e:
-                print(f"❌ {e}")
-                failed_count += 1
-        
-        print(f"\n✅ Ingested: {success_count}/{len(texts)}")
+        print(f"\n✅ Ingested: {success_count}/{total}")
         if failed_count > 0:
             print(f"⚠️  Failed: {failed_count}")
         
         return success_count
     
+    async def _ingest_texts(self, texts_file: Path, total: int) -> int:
+        """Stream texts from texts_file to the API concurrently, returning the success count"""
+        # Acquired before each line is read, so at most this many texts are in memory
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_INGESTS)
+        
+        # HTTP/2 multiplexes requests over one connection when the API serves it over TLS
+        async with httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=httpx.AsyncHTTPTransport(
+                uds=self.uds,
+                http2=True,
+                limits=httpx.Limits(max_connections=16),
+                retries=5
+            ),
+            timeout=60,
+            headers={"User-Agent": USER_AGENT}
+        ) as client:
+            tasks = []
+            # Warnings go through tqdm so they don't break up the progress bar
+            with (
+                open(texts_file, "rb") as f,
+                logging_redirect_tqdm(),
+                tqdm(total=total, desc="Ingesting") as progress
+            ):
+                
+                def on_done(_task: asyncio.Task):
+                    semaphore.release()
+                    progress.update()
+                
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    # A malformed line counts as one failed text, not a failed run
+                    try:
+                        text_data = orjson.loads(line)
+                        if not isinstance(text_data, dict):
+                            raise ValueError(f"expected an object, got {type(text_data).__name__}")
+                    except ValueError as e:  # orjson.JSONDecodeError is a ValueError
+                        log.warning("Skipping malformed line %d of %s: %s", line_number, texts_file, e)
+                        progress.update()
+                        continue
+                    await semaphore.acquire()
+                    task = asyncio.create_task(self._ingest_one(client, text_data))
+                    task.add_done_callback(on_done)
+                    tasks.append(task)
+                
+                results = await asyncio.gather(*tasks)
+        
+        return sum(results)
+    
+    async def _ingest_one(self, client: httpx.AsyncClient, text_data: dict) -> bool:
+        """Submit one text, returning whether the API accepted it
+        
+        Any error (network, bad response body, missing fields) fails only this text.
+        """
+        entity_id = text_data.get("entity_id")
+        
+        try:
+            body = orjson.dumps({
+                "entity_id": entity_id,
+                "text": text_data["text"]
+            })
+            headers = {"Content-Type": "application/json"}
+            
+            # Biographies compress well, so gzip the body to cut upload size
+            if self.gzip_bodies:
+                body = gzip.compress(body, compresslevel=6)
+                headers["Content-Encoding"] = "gzip"
+            
+            response = await self._apost(
+                client,
+                f"/api/{self.dataset_id}/ingest",
+                content=body,
+                headers=headers
+            )
+            
+            if response.status_code != 200:
+                log.warning("Failed to ingest %s: %s", entity_id, response.status_code)
+                return False
+            
+            ngrams = response.json().get("ngrams_extracted", 0)
+        except Exception as e:
+            log.warning("Failed to ingest %s: %s", entity_id, e)
+            return False
+        
+        log.debug("Ingested %s (%d n-grams)", entity_id, ngrams)
+        return True
+    
     def submit_all(self):
         """Submit both metadata and texts"""
         
@@ -140,11 +263,14 @@ def main():
     
     import argparse
     
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    
     parser = argparse.ArgumentParser(description="Submit Women in Mathematics dataset")
     parser.add_argument(
         "--api-url",
         default="http://localhost:8000",
-        help="Storywrangler API URL (default: http://localhost:8000)"
+        help="Storywrangler API URL, or unix:///path/to.sock for a local API "
+             "started with uvicorn --uds (default: http://localhost:8000)"
     )
     parser.add_argument(
         "--metadata-only",
@@ -156,18 +282,22 @@ def main():
         action="store_true",
         help="Only submit texts, skip metadata"
     )
+    parser.add_argument(
+        "--gzip",
+        action="store_true",
+        help="Gzip text upload bodies (the API must decode Content-Encoding: gzip requests)"
+    )
     
     args = parser.parse_args()
     
     output_dir = Path(__file__).parent.parent / "output"
-    submitter = WomenInMathSubmitter(output_dir, args.api_url)
-    
-    if args.metadata_only:
-        submitter.submit_metadata()
-    elif args.texts_only:
-        submitter.submit_texts()
-    else:
-        submitter.submit_all()
+    with WomenInMathSubmitter(output_dir, args.api_url, gzip_bodies=args.gzip) as submitter:
+        if args.metadata_only:
+            submitter.submit_metadata()
+        elif args.texts_only:
+            submitter.submit_texts()
+        else:
+            submitter.submit_all()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,150 @@
+"""Tests for matching people to biography text files in the adapter."""
+import importlib.util
+import time
+from pathlib import Path
+from unittest.mock import Mock
+
+import orjson
+import pandas as pd
+import pytest
+
+PREPARE_PATH = Path(__file__).parent.parent / "adapter" / "src" / "prepare.py"
+spec = importlib.util.spec_from_file_location("prepare", PREPARE_PATH)
+prepare = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(prepare)
+
+
+def build_adapter(tmp_path: Path, names: list[str], stems: list[str]) -> "prepare.WomenInMathAdapter":
+    data_dir = tmp_path / "data"
+    text_dir = tmp_path / "text"
+    data_dir.mkdir()
+    text_dir.mkdir()
+
+    pd.DataFrame({
+        "full_name": names,
+        "birthplace": None,
+        "birthyear": None,
+        "deathyear": None,
+    }).to_csv(data_dir / "personal.csv", index=False)
+
+    for stem in stems:
+        (text_dir / f"{stem}.pdf.txt").write_text(stem, encoding="utf-8")
+
+    return prepare.WomenInMathAdapter(data_dir, text_dir, tmp_path / "output")
+
+
+@pytest.fixture
+def adapter(tmp_path):
+    names = [
+        # People with a text file
+        "Helen Barton",
+        "Carolyn Grace Shover Quinn",
+        "Mary Virginia Landers Kenny",
+        "Emilie Noether",
+        # No text file, but sharing a first name with someone who has one
+        "Helen Gertrude Russell",
+        "Grace Andrews",
+        "Mary Evelyn Wells",
+        "Mary Emily Sinclair",
+        # Accented / misspelled versions of files nobody else claims
+        "Ada Lovelàce",
+        "Emily Smyth",
+        # Would match Emilie Noether's file, which is already taken
+        "Émilie Noether",
+    ]
+    stems = [
+        "barton_helen",
+        "quinn_carolyn_grace_shover",
+        "kenny_mary_virginia_landers_née",
+        "noether_emilie",
+        "lovelace_ada",
+        "smith_emily",
+    ]
+    return build_adapter(tmp_path, names, stems)
+
+
+def test_exact_matches(adapter):
+    assert adapter.text_files["Helen Barton"].name == "barton_helen.pdf.txt"
+    assert adapter.text_files["Carolyn Grace Shover Quinn"].name == "quinn_carolyn_grace_shover.pdf.txt"
+    assert adapter.text_files["Emilie Noether"].name == "noether_emilie.pdf.txt"
+    assert adapter.match_scores["Helen Barton"] == 100.0
+
+
+def test_shared_first_name_does_not_match(adapter):
+    for name in ["Helen Gertrude Russell", "Grace Andrews", "Mary Evelyn Wells", "Mary Emily Sinclair"]:
+        assert name not in adapter.text_files
+
+
+def test_fuzzy_match_ignores_accents(adapter):
+    assert adapter.text_files["Ada Lovelàce"].name == "lovelace_ada.pdf.txt"
+
+
+def test_fuzzy_match_allows_similar_sounding_surname(adapter):
+    assert adapter.text_files["Emily Smyth"].name == "smith_emily.pdf.txt"
+
+
+def test_claimed_file_is_not_reused(adapter):
+    assert "Émilie Noether" not in adapter.text_files
+    assert len(set(adapter.text_files.values())) == len(adapter.text_files)
+
+
+def test_punctuated_surname_reaches_fuzzy_match(tmp_path):
+    adapter = build_adapter(
+        tmp_path,
+        ["Bess Marie Allen (Eversull)", "Katharine Elizabeth O'Brien", "Christine Ladd-Franklin"],
+        ["eversull_bess_marie_alen", "obrien_katharine_elizabth", "ladd_franklin_christina"],
+    )
+    assert adapter.text_files["Bess Marie Allen (Eversull)"].name == "eversull_bess_marie_alen.pdf.txt"
+    assert adapter.text_files["Katharine Elizabeth O'Brien"].name == "obrien_katharine_elizabth.pdf.txt"
+    assert adapter.text_files["Christine Ladd-Franklin"].name == "ladd_franklin_christina.pdf.txt"
+
+
+def test_maiden_name_in_parentheses_matches_own_file(tmp_path):
+    adapter = build_adapter(
+        tmp_path,
+        ["Mary Virginia Landers (née Kenny)"],
+        ["kenny_mary_virginia_landers_nee"],
+    )
+    assert adapter.text_files["Mary Virginia Landers (née Kenny)"].name == "kenny_mary_virginia_landers_nee.pdf.txt"
+    assert adapter.match_scores["Mary Virginia Landers (née Kenny)"] >= prepare.FUZZY_SCORE_CUTOFF
+
+
+def test_malformed_wikidata_cache_entries_are_skipped(tmp_path):
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
+    (output_dir / ".wikidata_cache.json").write_text(
+        '{"ada lovelace": {"qid": "Q7259", "timestamp": 1e12},'
+        ' "no timestamp": {"qid": "Q1"},'
+        ' "not an entry": [1, 2]}'
+    )
+    adapter = build_adapter(tmp_path, ["Ada Lovelace"], ["lovelace_ada"])
+    assert list(adapter.wikidata_cache) == ["ada lovelace"]
+
+    (output_dir / ".wikidata_cache.json").write_text("[]")
+    assert adapter._load_wikidata_cache() == {}
+
+
+def test_texts_written_in_input_order(tmp_path):
+    names = ["Ada Byron", "Bea Cole", "Cora Dunn", "Dora Evans", "Eva Ford", "Fay Gray"]
+    # Everyone but Dora has a text
+    stems = ["byron_ada", "cole_bea", "dunn_cora", "ford_eva", "gray_fay"]
+    adapter = build_adapter(tmp_path, names, stems)
+
+    # No Wikidata hits; earlier people answer slowest so workers finish out of order
+    def search(url, params, timeout):
+        time.sleep(0.02 * (len(names) - names.index(params["search"])))
+        return Mock(status_code=200, json=lambda: {"search": []})
+
+    adapter.session = Mock()
+    adapter.session.post.return_value = Mock(status_code=200, json=lambda: {"results": {"bindings": []}})
+    adapter.session.get.side_effect = search
+
+    dataset, text_count = adapter.prepare()
+
+    lines = [orjson.loads(line) for line in adapter.texts_file.read_bytes().splitlines()]
+    assert text_count == len(lines) == 5
+    assert lines == [
+        {"entity_id": f"local:women-in-math:{stem.split('_')[1]}_{stem.split('_')[0]}", "text": stem}
+        for stem in stems
+    ]
+    assert [author["name"] for author in dataset["authors"]] == names
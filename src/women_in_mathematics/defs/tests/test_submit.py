@@ -0,0 +1,51 @@
+"""Tests for streaming texts to the ingest endpoint in the submitter."""
+import asyncio
+import importlib.util
+from pathlib import Path
+
+import httpx
+import orjson
+
+SUBMIT_PATH = Path(__file__).parent.parent / "adapter" / "src" / "submit.py"
+spec = importlib.util.spec_from_file_location("submit", SUBMIT_PATH)
+submit = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(submit)
+
+
+def test_bad_lines_and_responses_fail_only_their_text(tmp_path, monkeypatch):
+    received = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        entity_id = orjson.loads(request.content)["entity_id"]
+        received.append(entity_id)
+        if entity_id == "b":
+            return httpx.Response(200, text="<html>Bad Gateway</html>")
+        if entity_id == "e":
+            return httpx.Response(422, json={"detail": "invalid"})
+        return httpx.Response(200, json={"ngrams_extracted": 3})
+
+    monkeypatch.setattr(
+        submit.httpx, "AsyncHTTPTransport", lambda **kwargs: httpx.MockTransport(handler)
+    )
+
+    texts_file = tmp_path / "texts.ndjson"
+    texts_file.write_bytes(b"\n".join([
+        b'{"entity_id": "a", "text": "ok"}',
+        b"[1, 2]",
+        b"{not json",
+        b'{"entity_id": "b", "text": "html response"}',
+        b'{"entity_id": "c"}',
+        b"",
+        b'{"entity_id": "d", "text": "ok"}',
+        b'{"entity_id": "e", "text": "rejected"}',
+    ]))
+
+    submitter = submit.WomenInMathSubmitter(tmp_path, "http://testserver")
+    try:
+        success = asyncio.run(submitter._ingest_texts(texts_file, total=7))
+    finally:
+        submitter.close()
+
+    assert success == 2
+    # Malformed lines and the text-less entry never reach the API
+    assert sorted(received) == ["a", "b", "d", "e"]